@@ -1,14 +1,19 @@
-from atproto import Client, client_utils, exceptions
+from atproto import Client, Session, SessionEvent, client_utils, exceptions, models
+import asyncio
 import os
 import boto3
+import httpx
+import json
+import random
 from aws_lambda_powertools.utilities import parameters
 import time
-import feedparser
+import fastfeedparser as feedparser
 from aws_lambda_powertools import Logger, Metrics
 from datetime import datetime
-from strip_tags import strip_tags
+from types import SimpleNamespace
+from lxml import etree, html
 from atproto.exceptions import RequestException
-from aws_lambda_powertools.metrics import MetricUnit
+from aws_lambda_powertools.metrics import MetricUnit, single_metric
 
 
 # Function to fetch environment variables with default values
@@ -16,9 +21,11 @@ def get_env_var(name, default):
     return os.environ.get(name, default)
 
 
-# Custom exception for rate limit exceeded
+# Custom exception for rate limit exceeded, carrying how long Bluesky asked us to wait
 class RateLimitExceededError(Exception):
-    pass
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 # disable this if you don't want to enable snarky commentary
@@ -35,26 +42,63 @@ PASSWORD_PARAM = os.environ.get(
 ANTHROPIC_API_KEY_PARAM = os.environ.get(
     "ANTHROPIC_API_KEY", "/snarkbot/anthropic-api-key"
 )
+# Written by the bot itself, so cold starts can resume a session instead of logging in
+SESSION_PARAM = os.environ.get(
+    "SNARKBOT_SESSION_PARAM", "/snarkbot/bluesky-session"
+)
 
 RSS_FEED_URL = get_env_var("RSS_FEED_URL", "http://aws.amazon.com/new/feed/")
+# The feed's ETag/Last-Modified live in the posts table under a key no real GUID will collide with
+FEED_STATE_KEY = f"feed-state#{RSS_FEED_URL}"
 REGION = "us-west-2"
-
-# Setting these up here so that they're only loaded once per function instantiation
-ssm_provider = parameters.SSMProvider()
-USERNAME = ssm_provider.get(USERNAME_PARAM, decrypt=True)
-APP_PASSWORD = ssm_provider.get(PASSWORD_PARAM, decrypt=True)
-ANTHROPIC_API_KEY = ssm_provider.get(ANTHROPIC_API_KEY_PARAM, decrypt=True)
-posts_table = boto3.resource("dynamodb", region_name=REGION).Table(
-    os.environ["PostsTableName"]
+# Cap on entries summarized/posted at once so we stay polite to Bluesky and Anthropic
+MAX_CONCURRENCY = int(get_env_var("MAX_CONCURRENCY", "8"))
+# How many times to back off and retry a rate-limited post, and the longest we'll wait each time
+MAX_RATE_LIMIT_RETRIES = 3
+MAX_BACKOFF_SECONDS = 30
+
+# Setting these up here so that they're only loaded once per function instantiation,
+# in a single GetParameters call rather than one per parameter
+ssm_parameters = parameters.get_parameters_by_name(
+    {USERNAME_PARAM: {}, PASSWORD_PARAM: {}, ANTHROPIC_API_KEY_PARAM: {}, SESSION_PARAM: {}},
+    decrypt=True,
+    max_age=900,
+    raise_on_error=False,  # The session doesn't exist until our first login
 )
+USERNAME = ssm_parameters[USERNAME_PARAM]
+APP_PASSWORD = ssm_parameters[PASSWORD_PARAM]
+ANTHROPIC_API_KEY = ssm_parameters[ANTHROPIC_API_KEY_PARAM]
+SAVED_SESSION = ssm_parameters.get(SESSION_PARAM)
+dynamodb = boto3.resource("dynamodb", region_name=REGION)
+posts_table = dynamodb.Table(os.environ["PostsTableName"])
 recency_threshold = int(os.environ["PostRecencyThreshold"])
+sqs = boto3.client("sqs", region_name=REGION)
+ENTRY_QUEUE_URL = os.environ.get("EntryQueueUrl")
 logger = Logger()
-client = Client()
-client.login(USERNAME, APP_PASSWORD)
+# Logged in lazily by get_client() so runs with nothing to post never touch Bluesky
+client = None
 metrics = Metrics(namespace="snarkBotMetrics")
+# A single event loop reused across warm invocations, so the async Anthropic
+# client's connection pool stays bound to a loop that's still alive.
+loop = asyncio.new_event_loop()
+http_client = httpx.AsyncClient(timeout=5, follow_redirects=True)
+# Claude summaries by GUID, kept for the life of the sandbox
+summary_cache = {}
+# How long a summary saved for a redelivered entry sticks around in the posts table
+SUMMARY_TTL_SECONDS = 24 * 60 * 60
+# How many times a rejected post is shrunk locally before asking Claude for a new summary
+MAX_LOCAL_TRIMS = 2
+# Summaries start on the small, cheap model and only escalate when it doesn't work out
+SUMMARY_MODEL = get_env_var("SUMMARY_MODEL", "claude-haiku-4-5")
+ESCALATION_MODEL = get_env_var("ESCALATION_MODEL", "claude-sonnet-4-5")
 # These will be initialized in the lambda handler to prevent accumulation across invocations
 anthropic_counter = None
+anthropic_model_counts = None
 items = None
+summary_cache_hits = None
+failed_posts = None
+# Unconditional posts table writes waiting for the end-of-invocation flush
+pending_writes = []
 
 
 # Truncating mid-word feels unnatural, so we'll trim to the last word instead.
@@ -66,45 +110,183 @@ def trim_to_last_word(text, max_length):
     return trimmed
 
 
-# Check if the given time is within the specified number of minutes from now
-def within(t: time.struct_time, minutes: int) -> bool:
-    return abs(time.mktime(time.gmtime()) - time.mktime(t)) <= (minutes * 60)
+# Flatten an HTML description to plain text; lxml parses it in C in a single pass
+def strip_tags(text: str) -> str:
+    try:
+        return " ".join(html.fromstring(text).text_content().split())
+    except etree.ParserError:
+        return ""  # Nothing but whitespace or comments
+
 
+# Check if the given ISO 8601 timestamp is within the specified number of minutes before now;
+# anything dated in the future doesn't count
+def within(published: str, minutes: int, now: float = None) -> bool:
+    if now is None:
+        now = time.time()
+    age = now - datetime.fromisoformat(published).timestamp()
+    return 0 <= age <= (minutes * 60)
 
-# Check if the post with the given GUID has already been posted
-def already_posted(guid: str) -> bool:
+
+# Persist the session whenever atproto creates or refreshes it; refresh tokens rotate,
+# so a copy saved only at login would stop working after the first refresh
+def save_session(event: SessionEvent, session: Session):
+    if event not in (SessionEvent.CREATE, SessionEvent.REFRESH):
+        return
     try:
-        response = posts_table.get_item(Key={"guid": guid})
-        exists = "Item" in response
-        logger.debug(f"DynamoDB check for {guid}: exists={exists}")
-        return exists
+        parameters.set_parameter(
+            name=SESSION_PARAM,
+            value=session.encode(),
+            parameter_type="SecureString",
+            overwrite=True,
+        )
+        logger.info(f"Saved Bluesky session after {event.value}")
     except Exception as e:
-        logger.error(f"DynamoDB error checking {guid}: {e}")
-        # Return True to avoid reprocessing on DB errors
-        return True
+        logger.warning(f"Could not save Bluesky session: {e}")
+
+
+# Log in to Bluesky on first use, resuming the saved session so cold starts can skip password auth
+def get_client() -> Client:
+    global client
+    if client is not None:
+        return client
+    bluesky = Client()
+    bluesky.on_session_change(save_session)
+    if SAVED_SESSION:
+        try:
+            bluesky.login(session_string=SAVED_SESSION)
+            client = bluesky
+            return client
+        except Exception as e:
+            logger.warning(f"Saved Bluesky session rejected, logging in with password: {e}")
+    bluesky.login(USERNAME, APP_PASSWORD)
+    client = bluesky
+    return client
+
+
+# Load the validators from the last time we fetched the feed
+def load_feed_state() -> dict:
+    response = posts_table.get_item(Key={"guid": FEED_STATE_KEY})
+    return response.get("Item", {})
+
+
+# Remember the feed's validators so the next run can skip an unchanged feed
+def save_feed_state(response):
+    queue_write(
+        {
+            "guid": FEED_STATE_KEY,
+            "etag": response.headers.get("ETag", ""),
+            "last_modified": response.headers.get("Last-Modified", ""),
+        }
+    )
+
+
+# Queue an unconditional write to the posts table for the end-of-invocation flush
+def queue_write(item: dict):
+    pending_writes.append(item)
+
+
+# Flush queued writes with BatchWriteItem; the batch writer sends 25 items per call
+# and resends anything DynamoDB leaves unprocessed
+def flush_writes():
+    if not pending_writes:
+        return
+    logger.info(f"Writing {len(pending_writes)} items to DynamoDB")
+    with posts_table.batch_writer(overwrite_by_pkeys=["guid"]) as batch:
+        for item in pending_writes:
+            batch.put_item(Item=item)
+    pending_writes.clear()
+
+
+# Conditionally fetch the feed; returns None if it hasn't changed since we last saw it
+async def fetch_feed(feed_state: dict):
+    headers = {}
+    if feed_state.get("etag"):
+        headers["If-None-Match"] = feed_state["etag"]
+    if feed_state.get("last_modified"):
+        headers["If-Modified-Since"] = feed_state["last_modified"]
+    response = await http_client.get(RSS_FEED_URL, headers=headers)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    return response
+
+
+# Look up which of the given GUIDs have already been posted, in as few round trips as possible;
+# with_summaries also loads summaries saved by earlier attempts into summary_cache
+def fetch_posted_guids(guids, with_summaries: bool = False) -> set:
+    guids = list(dict.fromkeys(guids))  # BatchGetItem rejects duplicates
+    keys = [{"guid": guid} for guid in guids]
+    if with_summaries:
+        keys += [{"guid": f"summary#{guid}"} for guid in guids]
+    posted = set()
+    try:
+        for start in range(0, len(keys), 100):  # BatchGetItem takes at most 100 keys
+            request = {
+                posts_table.name: {
+                    "Keys": keys[start:start + 100],
+                    "ProjectionExpression": "guid, #summary",
+                    "ExpressionAttributeNames": {"#summary": "summary"},
+                }
+            }
+            attempt = 0
+            while request:
+                if attempt:
+                    # Unprocessed keys mean DynamoDB is throttling us, so back off before resending
+                    time.sleep(min(1.0, 0.05 * 2 ** attempt) * random.random())
+                response = dynamodb.batch_get_item(RequestItems=request)
+                for item in response["Responses"].get(posts_table.name, []):
+                    if item["guid"].startswith("summary#"):
+                        summary_cache[item["guid"].removeprefix("summary#")] = item["summary"]
+                    else:
+                        posted.add(item["guid"])
+                request = response.get("UnprocessedKeys")
+                attempt += 1
+    except Exception as e:
+        # Fail the invocation rather than guess; the next scheduled run will retry
+        logger.error(f"DynamoDB error checking posted GUIDs: {e}")
+        raise
+    logger.debug(f"DynamoDB check: {len(posted)} of {len(guids)} GUIDs already posted")
+    return posted
 
 
 if snarky_mode:
     import anthropic
 
-    ai_client = anthropic.Anthropic(
+    ai_client = anthropic.AsyncAnthropic(
         # defaults to os.environ.get("ANTHROPIC_API_KEY")
         api_key=ANTHROPIC_API_KEY,
+        # The SDK applies its own timeout per request, so it's set here rather than on the pool
+        timeout=httpx.Timeout(30.0, connect=3.0),
+        # HTTP/2 multiplexes concurrent and retried calls over one connection, and a long
+        # keepalive lets warm invocations skip the TLS handshake entirely
+        http_client=anthropic.DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60.0),
+        ),
     )
 
-    # AWS is bad at explaining itself so we'll tag in AI to help.
-    # We're using Anthropic directly intead of Bedrock because I
-    # don't believe in rewarding bad behavior.
-    def snarkify(text, trim: int):
+    SNARK_SYSTEM_PROMPT = "You are Corey Quinn, a cloud economist known for extremely sarcastic, biting commentary about AWS. You're writing for BlueSky which has STRICT character limits - brevity is CRITICAL. Your responses must be punchy, concise snark about AWS's pricing, naming conventions, and corporate behavior. Be brutal, be funny, be accurate, but BE BRIEF. Mock their marketing speak and pricing complexity in the fewest words possible. Every character counts. DO NOT LABEL YOUR RESPONSE. If the prompt is empty, return an empty set."
+    BATCH_SYSTEM_PROMPT = SNARK_SYSTEM_PROMPT + " When given a JSON array of announcements, respond with ONLY a JSON array where each element has the announcement's 'id' and your post as 'summary', no longer than that announcement's 'trim' characters. No prose, no code fences."
+
+    # Tally each Anthropic call, overall and per model
+    def count_anthropic_call(model: str):
         global anthropic_counter
         if anthropic_counter is not None:
             anthropic_counter += 1
-        logger.info(f"Calling Anthropic API (count: {anthropic_counter}) with trim={trim}, text_length={len(text)}")
-        message = ai_client.messages.create(
-            model="claude-sonnet-4-5",
+        if anthropic_model_counts is not None:
+            anthropic_model_counts[model] = anthropic_model_counts.get(model, 0) + 1
+
+    # AWS is bad at explaining itself so we'll tag in AI to help.
+    # We're using Anthropic directly intead of Bedrock because I
+    # don't believe in rewarding bad behavior.
+    async def snarkify(text, trim: int, model: str = SUMMARY_MODEL):
+        count_anthropic_call(model)
+        logger.info(f"Calling Anthropic API (count: {anthropic_counter}) with model={model}, trim={trim}, text_length={len(text)}")
+        message = await ai_client.messages.create(
+            model=model,
             max_tokens=1000,
             temperature=0,
-            system="You are Corey Quinn, a cloud economist known for extremely sarcastic, biting commentary about AWS. You're writing for BlueSky which has STRICT character limits - brevity is CRITICAL. Your responses must be punchy, concise snark about AWS's pricing, naming conventions, and corporate behavior. Be brutal, be funny, be accurate, but BE BRIEF. Mock their marketing speak and pricing complexity in the fewest words possible. Every character counts. DO NOT LABEL YOUR RESPONSE. If the prompt is empty, return an empty set.",
+            system=SNARK_SYSTEM_PROMPT,
             messages=[
                 {
                     "role": "user",
@@ -118,124 +300,411 @@ if snarky_mode:
             ],
         )
         logger.info(f"Snarkified to {trim}: {message.content[0].text}")
+        if not message.content[0].text.strip() and model != ESCALATION_MODEL:
+            logger.warning(f"Empty summary from {model}, escalating to {ESCALATION_MODEL}")
+            return await snarkify(text, trim, model=ESCALATION_MODEL)
         return message.content[0].text
 
+    # Summarize several announcements in one Claude call, so the prompt preamble is paid for once.
+    # Returns summaries by GUID; anything missing, unparseable, or lost to an API error falls back to snarkify.
+    async def snarkify_batch(entries, model: str = SUMMARY_MODEL) -> dict:
+        count_anthropic_call(model)
+        logger.info(f"Calling Anthropic API (count: {anthropic_counter}) with model={model} for a batch of {len(entries)} entries")
+        announcements = [
+            {"id": idx, "trim": 295 - len(entry.title), "text": entry.description}
+            for idx, entry in enumerate(entries)
+        ]
+        try:
+            message = await ai_client.messages.create(
+                model=model,
+                max_tokens=min(1000 * len(entries), 8000),
+                temperature=0,
+                system=BATCH_SYSTEM_PROMPT,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": f"Transform each of these AWS announcements into a snarky BlueSky post. CRITICAL: each post must fit within its 'trim' characters (BlueSky limit). Return a JSON array of objects with 'id' and 'summary'. Announcements: \n {json.dumps(announcements)}",
+                            }
+                        ],
+                    }
+                ],
+            )
+        except anthropic.APIError as e:
+            # One failed call shouldn't sink the whole batch; summarize each entry instead
+            logger.warning(f"Batched summary call failed, falling back to one call per entry: {e}")
+            return {}
+        text = message.content[0].text
+        try:
+            # Tolerate stray prose or code fences around the array
+            results = json.loads(text[text.index("["):text.rindex("]") + 1])
+            summaries = {}
+            for result in results:
+                idx, summary = result.get("id"), result.get("summary")
+                # Drop anything that doesn't point at one of our entries or isn't text,
+                # rather than post it under the wrong title; those entries get snarkify
+                if isinstance(idx, int) and 0 <= idx < len(entries) and isinstance(summary, str) and summary.strip():
+                    summaries[entries[idx].id] = summary
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            logger.warning(f"Could not parse batched summaries, falling back to one call per entry: {e}")
+            return {}
+        logger.info(f"Snarkified {len(summaries)} of {len(entries)} entries in one call")
+        return summaries
+
+    # Save the summaries of entries we couldn't post, so their redelivery doesn't pay for them
+    # again; fetch_posted_guids loads them back, and the TTL clears out the ones nobody needs
+    def save_summaries(entries):
+        expires_at = int(time.time()) + SUMMARY_TTL_SECONDS
+        for entry in entries:
+            if summary_cache.get(entry.id):
+                queue_write(
+                    {
+                        "guid": f"summary#{entry.id}",
+                        "summary": summary_cache[entry.id],
+                        "expires_at": expires_at,
+                    }
+                )
+
+    # Summarize an entry, reusing an earlier summary for it when one fits within trim
+    async def summarize(entry, trim: int, use_cache: bool = True, model: str = SUMMARY_MODEL):
+        global summary_cache_hits
+        summary = summary_cache.get(entry.id) if use_cache else None
+        if summary is not None and len(summary) <= trim:
+            logger.info(f"Reusing cached summary for {entry.id}")
+            if summary_cache_hits is not None:
+                summary_cache_hits += 1
+            return summary
+        summary = await snarkify(entry.description, trim, model=model)
+        if summary:
+            summary_cache[entry.id] = summary
+        return summary
+
+    # Summarize every entry that doesn't have a cached summary yet in a single call
+    async def summarize_batch(entries) -> dict:
+        pending = [entry for entry in entries if summary_cache.get(entry.id) is None]
+        if len(pending) < 2:
+            return {}  # Nothing to share a call with; summarize handles it
+        summaries = await snarkify_batch(pending)
+        summary_cache.update(summaries)
+        return summaries
+
+
+# How long Bluesky asked us to wait, from Retry-After or its ratelimit-reset epoch
+def retry_after_seconds(response):
+    headers = {name.lower(): value for name, value in (response.headers or {}).items()}
+    try:
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+        if "ratelimit-reset" in headers:
+            return max(0.0, float(headers["ratelimit-reset"]) - time.time())
+    except ValueError:
+        pass  # e.g. an HTTP-date Retry-After; fall back to exponential backoff
+    return None
+
+
+# Whether Bluesky answered with a 4xx, so we know the request didn't create anything;
+# a timeout, dropped connection, or 5xx leaves us unsure whether it landed
+def rejected_by_bluesky(err) -> bool:
+    response = getattr(err, "response", None)
+    return response is not None and 400 <= response.status_code < 500
+
+
+# Exponential backoff with jitter, honoring the server's hint when it gives one
+def backoff_seconds(attempt: int, retry_after=None) -> float:
+    if retry_after is not None:
+        return min(MAX_BACKOFF_SECONDS, retry_after)
+    return min(MAX_BACKOFF_SECONDS, 2 ** attempt + random.random())
+
+
+# Build the linked title once per entry; only the payload changes between attempts
+def post_prefix(entry):
+    prefix = client_utils.TextBuilder().link(entry.title, entry.link).text("\n\n")
+    return prefix.build_text(), prefix.build_facets()
+
 
 # Post the entry to the client
-def snarkit(entry, payload):
-    logger.info(f"Posting {entry.guid} - {entry.title}")
+def snarkit(entry, prefix, payload):
+    logger.info(f"Posting {entry.id} - {entry.title}")
     logger.info(f"Link: {entry.link}")
-    logger.info(f"Link length: {len(entry.link)}")
-    text = (
-        client_utils.TextBuilder()
-        .link(entry.title, entry.link)
-        .text("\n\n")
-        .text(payload)
-    )
+    prefix_text, facets = prefix
+    # The link facet's byte offsets stay valid since the payload is appended after it
+    text = prefix_text + payload
     try:
-        client.send_post(text)
-    except RequestException as err:
-        if err.response.status_code == 429:
+        get_client().send_post(text, facets=facets)
+    except (RequestException, exceptions.BadRequestError) as err:
+        if err.response is not None and err.response.status_code == 429:
             logger.error("Rate limit exceeded.")
-            raise RateLimitExceededError("Rate limit exceeded.")
-        logger.error(f"Failed to post {entry.guid} due to request exception: {err}")
+            raise RateLimitExceededError(
+                "Rate limit exceeded.", retry_after=retry_after_seconds(err.response)
+            )
+        logger.error(f"Failed to post {entry.id} due to request exception: {err}")
         raise err
     except Exception as err:
-        logger.error(f"Unexpected error while posting {entry.guid}: {err}")
+        logger.error(f"Unexpected error while posting {entry.id}: {err}")
         raise err
     return text
 
 
-# Process each entry from the feed
-def process_entry(entry):
-    is_recent = within(entry.published_parsed, minutes=recency_threshold)
-    is_posted = already_posted(entry.guid)
+# Claim an entry with a conditional write so only one invocation ever posts it;
+# returns False if another instance got there first
+def claim_entry(entry) -> bool:
+    try:
+        posts_table.put_item(
+            Item={
+                "guid": entry.id,
+                "title": entry.title,
+                "link": entry.link,
+            },
+            ConditionExpression="attribute_not_exists(guid)"
+        )
+        logger.info(f"Successfully claimed {entry.id} in DynamoDB")
+        return True
+    except Exception as claim_error:
+        # Another Lambda instance already claimed this post
+        if "ConditionalCheckFailedException" in str(claim_error):
+            logger.info(f"Post {entry.id} already claimed by another instance, skipping")
+            return False
+        else:
+            # Other DynamoDB error, re-raise
+            raise claim_error
+
+
+# Give up a claim on an entry we didn't manage to post, so a later run or redelivery can
+def release_claim(entry):
+    posts_table.delete_item(Key={"guid": entry.id})
+
+
+# Mark an entry as failed in DynamoDB so nothing tries to post it again; this overwrites its claim
+def mark_failed(entry, err):
+    global failed_posts
+    queue_write(
+        {
+            "guid": entry.id,
+            "title": f"FAILED: {entry.title[:100]}",
+            "link": "FAILED_POST",
+            "error": str(err)[:500],
+            "timestamp": str(time.time())
+        }
+    )
+    if failed_posts is not None:
+        failed_posts += 1
 
-    logger.info(f"Entry check - GUID: {entry.guid}, Recent: {is_recent}, Already posted: {is_posted}")
 
-    if is_recent and not is_posted:
-        logger.info(f"Processing new entry: {entry.guid} - {entry.title}")
-        global items
+# Post several entries in one applyWrites call, so K posts cost a single signed request.
+# applyWrites is all-or-nothing, so only entries whose first payload should clearly fit
+# go in; returns the GUIDs that are finished (or given up on) and the ones claimed but still unposted.
+async def post_batch(entries, summaries):
+    global items
+    candidates = []
+    for entry in entries:
+        trim = 295 - len(entry.title)  # 300 max minus \n\n and …
+        if snarky_mode:
+            if not summaries.get(entry.id):
+                continue
+            payload = trim_to_last_word(summaries[entry.id], trim)
+        else:
+            payload = trim_to_last_word(strip_tags(entry.description), trim)
+        prefix_text, facets = post_prefix(entry)
+        text = prefix_text + payload
+        if len(text) <= 300:  # Code points bound graphemes from above
+            candidates.append((entry, text, facets))
+    if len(candidates) < 2:
+        return set(), set()  # Nothing to share a request with; process_entry handles it
+
+    done = set()
+    claimed = []
+    try:
+        for entry, text, facets in candidates:
+            if claim_entry(entry):
+                claimed.append((entry, text, facets))
+            else:
+                done.add(entry.id)
+        if not claimed:
+            return done, set()
+
+        bluesky = get_client()
+        created_at = bluesky.get_current_time_iso()
+        writes = [
+            models.ComAtprotoRepoApplyWrites.Create(
+                collection=models.ids.AppBskyFeedPost,
+                value=models.AppBskyFeedPost.Record(
+                    created_at=created_at, text=text, facets=facets, langs=["en"]
+                ),
+            )
+            for _, text, facets in claimed
+        ]
+    except Exception:
+        # Nothing has been posted yet, so hand the claims back before the batch is redelivered
+        for entry, _, _ in claimed:
+            release_claim(entry)
+        raise
+    logger.info(f"Posting {len(writes)} entries in one applyWrites call")
+    try:
+        await asyncio.to_thread(
+            bluesky.com.atproto.repo.apply_writes,
+            models.ComAtprotoRepoApplyWrites.Data(repo=bluesky.me.did, writes=writes),
+        )
+    except Exception as err:
+        if rejected_by_bluesky(err):
+            # The whole batch was turned away (too long, rate limited), so hand everything
+            # back to process_entry's retry ladder, claims and all
+            logger.warning(f"applyWrites rejected, posting entries one at a time: {err}")
+            return done, {entry.id for entry, _, _ in claimed}
+        # The writes may have been committed before the error reached us; posting them one
+        # at a time could duplicate every one, so keep the claims and give up on the batch
+        logger.error(f"Unsure whether applyWrites went through, marking its entries as failed: {err}")
+        for entry, _, _ in claimed:
+            mark_failed(entry, err)
+            done.add(entry.id)
+        return done, set()
+
+    for entry, _, _ in claimed:
+        logger.info(f"Posted {entry.id} - {entry.title}")
+        done.add(entry.id)
         if items is not None:
             items += 1
-        trim = 295 - len(entry.title)  # 300 max minus \n\n and …
-        retry_count = 0
-        max_retries = 5  # Limit retries to prevent excessive API calls
-        while trim >= 100 and retry_count < max_retries:
-            try:
-                logger.info(f"Attempt {retry_count + 1}/{max_retries} for {entry.guid} with trim={trim}")
-                if snarky_mode:
-                    payload = snarkify(entry.description, trim)
+    return done, set()
+
+
+# Process a single new entry, starting from its batched summary if there is one;
+# returns False if we hit a rate limit and should stop
+async def process_entry(entry, summary=None, claimed=False):
+    logger.info(f"Processing new entry: {entry.id} - {entry.title}")
+    global items
+    if items is not None:
+        items += 1
+    trim = 295 - len(entry.title)  # 300 max minus \n\n and …
+    prefix = post_prefix(entry)
+    retry_count = 0
+    max_retries = 5  # Limit retries to prevent excessive API calls
+    payload = None
+    local_trims = 0
+    rate_limit_retries = 0
+    resend = False
+    while trim >= 100 and retry_count < max_retries:
+        posting = False
+        try:
+            logger.info(f"Attempt {retry_count + 1}/{max_retries} for {entry.id} with trim={trim}")
+            if resend:
+                resend = False  # Bluesky only asked us to slow down, so send the same payload again
+            elif not snarky_mode:
+                payload = trim_to_last_word(strip_tags(entry.description), trim)
+            elif payload is None and summary:
+                payload = trim_to_last_word(summary, trim)
+            elif payload is not None and local_trims < MAX_LOCAL_TRIMS:
+                # Shrink the summary we already have before paying for another one. Claude
+                # often comes in well under trim, so always cut at least 15 characters;
+                # resending the same text would just be rejected again.
+                local_trims += 1
+                payload = trim_to_last_word(payload, min(trim, len(payload) - 15))
+            else:
+                local_trims = 0
+                # Once we're retrying, a cached summary that fits has already been tried,
+                # and the small model's take didn't make it, so bring in the bigger one
+                if retry_count == 0:
+                    payload = await summarize(entry, trim)
                 else:
-                    payload = trim_to_last_word(strip_tags(entry.description), trim)
-
-                # Claim this post FIRST with a conditional write to prevent race conditions
-                try:
-                    posts_table.put_item(
-                        Item={
-                            "guid": entry.guid,
-                            "title": entry.title,
-                            "link": entry.link,
-                        },
-                        ConditionExpression="attribute_not_exists(guid)"
-                    )
-                    logger.info(f"Successfully claimed {entry.guid} in DynamoDB")
-                except Exception as claim_error:
-                    # Another Lambda instance already claimed this post
-                    if "ConditionalCheckFailedException" in str(claim_error):
-                        logger.info(f"Post {entry.guid} already claimed by another instance, skipping")
-                        return True
-                    else:
-                        # Other DynamoDB error, re-raise
-                        raise claim_error
+                    payload = await summarize(entry, trim, use_cache=False, model=ESCALATION_MODEL)
+
+            # Claim this post FIRST with a conditional write to prevent race conditions
+            if not claimed:
+                if not claim_entry(entry):
+                    return True
+                claimed = True
 
-                # NOW post to Bluesky (we've already claimed it)
-                snarkit(entry, payload)
-                break
-            except RateLimitExceededError:
+            # NOW post to Bluesky (we've already claimed it)
+            posting = True
+            await asyncio.to_thread(snarkit, entry, prefix, payload)
+            break
+        except RateLimitExceededError as err:
+            rate_limit_retries += 1
+            if rate_limit_retries > MAX_RATE_LIMIT_RETRIES:
                 logger.error("Rate limit exceeded, stopping execution.")
+                if claimed:
+                    release_claim(entry)
                 return False
-            except exceptions.BadRequestError as err:
-                logger.warning(f"BadRequestError for {entry.guid} with trim={trim}: {str(err)}")
-                logger.warning(f"Response status: {err.response.status_code}, Response body: {err.response.text if hasattr(err.response, 'text') else 'N/A'}")
-                if err.response.status_code == 429:
-                    logger.warning("Rate limited (429), stopping retries for this entry")
-                    break
-                trim -= 15
-                retry_count += 1
-                logger.info(f"Retrying with reduced trim={trim}")
-                if trim < 100 or retry_count >= max_retries:
-                    logger.error(
-                        f"Failed to post {entry.guid} after {retry_count} attempts. Marking as failed to prevent retries."
-                    )
-                    # Mark as failed in DynamoDB to prevent endless retries
-                    posts_table.put_item(
-                        Item={
-                            "guid": entry.guid,
-                            "title": f"FAILED: {entry.title[:100]}",
-                            "link": "FAILED_POST",
-                            "error": str(err)[:500],
-                            "timestamp": str(time.time())
-                        }
-                    )
-                    metrics.add_metric(
-                        name="FailedPosts", unit=MetricUnit.Count, value=1
-                    )
-        return True
+            delay = backoff_seconds(rate_limit_retries, err.retry_after)
+            logger.warning(f"Rate limited posting {entry.id}, retrying in {delay:.1f}s")
+            # Only this entry waits; the others keep going
+            await asyncio.sleep(delay)
+            resend = True
+        except exceptions.BadRequestError as err:
+            logger.warning(f"BadRequestError for {entry.id} with trim={trim}: {str(err)}")
+            logger.warning(f"Response status: {err.response.status_code}, Response body: {err.response.text if hasattr(err.response, 'text') else 'N/A'}")
+            trim -= 15
+            retry_count += 1
+            logger.info(f"Retrying with reduced trim={trim}")
+            if trim < 100 or retry_count >= max_retries:
+                logger.error(
+                    f"Failed to post {entry.id} after {retry_count} attempts. Marking as failed to prevent retries."
+                )
+                # Mark as failed in DynamoDB to prevent endless retries
+                mark_failed(entry, err)
+        except Exception as err:
+            if posting and not rejected_by_bluesky(err):
+                # The post may have gone out before the error reached us, so keep the claim
+                # rather than risk a duplicate when the message is redelivered
+                logger.error(f"Unsure whether {entry.id} was posted, marking it as failed: {err}")
+                mark_failed(entry, err)
+                return True
+            # Anything that definitely didn't post (an Anthropic error, a 4xx) goes back to SQS;
+            # left claimed, the redelivered message would look already posted and be dropped
+            if claimed:
+                release_claim(entry)
+            raise
     return True
 
 
+# Summarize and post all new entries concurrently, bounded by MAX_CONCURRENCY;
+# returns the entries a rate limit or error kept us from finishing
+async def process_entries(entries):
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    rate_limited = asyncio.Event()
+    summaries = await summarize_batch(entries) if snarky_mode else {}
+    done, claimed = await post_batch(entries, summaries)
+    remaining = [entry for entry in entries if entry.id not in done]
+
+    async def bounded_process_entry(entry):
+        async with semaphore:
+            if rate_limited.is_set():
+                logger.warning(f"Skipping {entry.id} due to rate limit")
+                if entry.id in claimed:
+                    release_claim(entry)
+                return False
+            if not await process_entry(
+                entry, summaries.get(entry.id), claimed=entry.id in claimed
+            ):
+                rate_limited.set()
+                return False
+            return True
+
+    results = await asyncio.gather(
+        *(bounded_process_entry(entry) for entry in remaining), return_exceptions=True
+    )
+    unfinished = []
+    for entry, result in zip(remaining, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error processing {entry.id}: {result}")
+        if result is not True:
+            unfinished.append(entry)
+    if snarky_mode:
+        save_summaries(unfinished)
+    return unfinished
+
+
 # Circuit breaker: Track consecutive failures
 CIRCUIT_BREAKER_TABLE = os.environ.get('CircuitBreakerTableName', None)
 FAILURE_THRESHOLD = 5  # Number of consecutive failures before opening circuit
+breaker_table = dynamodb.Table(CIRCUIT_BREAKER_TABLE) if CIRCUIT_BREAKER_TABLE else None
 
 def check_circuit_breaker():
     """Check if circuit breaker is open"""
-    if not CIRCUIT_BREAKER_TABLE:
+    if breaker_table is None:
         return False  # No circuit breaker table configured
     
     try:
-        breaker_table = boto3.resource("dynamodb", region_name=REGION).Table(CIRCUIT_BREAKER_TABLE)
         response = breaker_table.get_item(Key={"id": "circuit_status"})
         if "Item" in response:
             status = response["Item"]
@@ -255,11 +724,10 @@ def check_circuit_breaker():
 
 def record_failure():
     """Record a failure and potentially open the circuit breaker"""
-    if not CIRCUIT_BREAKER_TABLE:
+    if breaker_table is None:
         return
     
     try:
-        breaker_table = boto3.resource("dynamodb", region_name=REGION).Table(CIRCUIT_BREAKER_TABLE)
         response = breaker_table.update_item(
             Key={"id": "failure_count"},
             UpdateExpression="ADD failure_count :inc",
@@ -286,55 +754,187 @@ def record_failure():
 
 def reset_failure_count():
     """Reset failure count on successful execution"""
-    if not CIRCUIT_BREAKER_TABLE:
+    if breaker_table is None:
         return
     
     try:
-        breaker_table = boto3.resource("dynamodb", region_name=REGION).Table(CIRCUIT_BREAKER_TABLE)
         breaker_table.delete_item(Key={"id": "failure_count"})
     except Exception as e:
         logger.error(f"Error resetting failure count: {e}")
 
-# Lambda handler function
+# Emit the invocation's counters in one go, leaving out zeros to keep the EMF payload small
+def emit_counters(counters: dict):
+    for name, value in counters.items():
+        if value:
+            metrics.add_metric(name=name, unit=MetricUnit.Count, value=value)
+
+
+# Reset the per-invocation counters and pending writes
+def start_invocation():
+    global anthropic_counter, anthropic_model_counts, items, summary_cache_hits, failed_posts
+    anthropic_counter = 0
+    anthropic_model_counts = {}
+    items = 0
+    summary_cache_hits = 0
+    failed_posts = 0
+    pending_writes.clear()
+
+
+# Log how the invocation went, feed the circuit breaker, and emit the counters
+def finish_invocation(start_time: float):
+    elapsed_time = time.time() - start_time
+    logger.info(f"Lambda completed in {elapsed_time:.2f}s - Anthropic calls: {anthropic_counter}, Items processed: {items}")
+    # Alert if we're making too many API calls
+    high_api_usage = anthropic_counter > 10
+    if high_api_usage:
+        logger.warning(f"High API usage detected: {anthropic_counter} calls in single run")
+        record_failure()  # Record this as a failure
+    else:
+        reset_failure_count()  # Reset on successful execution
+
+    emit_counters(
+        {
+            "AnthropicRequests": anthropic_counter,
+            "ItemsProcessed": items,
+            "SummaryCacheHits": summary_cache_hits,
+            "FailedPosts": failed_posts,
+            "HighAPIUsage": int(high_api_usage),
+        }
+    )
+    for model, count in anthropic_model_counts.items():
+        with single_metric(
+            name="AnthropicRequests",
+            unit=MetricUnit.Count,
+            value=count,
+            namespace=metrics.namespace,
+        ) as model_metric:
+            model_metric.add_dimension(name="AnthropicModel", value=model)
+
+
+# Only the fields process_entry needs travel through the queue
+def entry_message(entry) -> str:
+    return json.dumps(
+        {
+            "id": entry.id,
+            "title": entry.title,
+            "link": entry.link,
+            "description": entry.description,
+            "published": entry.published,
+        }
+    )
+
+
+# Queue entries for the consumer, 10 per SendMessageBatch call; raises if any didn't make it
+def enqueue_entries(entries):
+    for start in range(0, len(entries), 10):
+        batch = entries[start:start + 10]
+        response = sqs.send_message_batch(
+            QueueUrl=ENTRY_QUEUE_URL,
+            Entries=[
+                {"Id": str(idx), "MessageBody": entry_message(entry)}
+                for idx, entry in enumerate(batch)
+            ],
+        )
+        if response.get("Failed"):
+            raise RuntimeError(f"Failed to enqueue entries: {response['Failed']}")
+
+
+# Producer: check the feed for new entries and fan them out to the consumer through SQS
 @metrics.log_metrics()
 @logger.inject_lambda_context
-def lambda_handler(event, context):
-    global anthropic_counter, items
-    
+def producer_handler(event, context):
     # Check circuit breaker first
     if check_circuit_breaker():
         metrics.add_metric(
             name="CircuitBreakerOpen", unit=MetricUnit.Count, value=1
         )
         return {"statusCode": 200, "body": "Circuit breaker is open"}
-    
-    # Initialize counters for each invocation
-    anthropic_counter = 0
-    items = 0
-    
-    start_time = time.time()
-    logger.info(f"Lambda started at {start_time} - Fetching RSS feed from {RSS_FEED_URL}")
-    feed = feedparser.parse(RSS_FEED_URL)
+
+    pending_writes.clear()
+    logger.info(f"Fetching RSS feed from {RSS_FEED_URL}")
+    response = loop.run_until_complete(fetch_feed(load_feed_state()))
+    if response is None:
+        logger.info("RSS feed not modified since last run")
+        metrics.add_metric(name="FeedNotModified", unit=MetricUnit.Count, value=1)
+        return {"statusCode": 200, "body": "Feed not modified"}
+
+    # We only need the basic fields, so skip parsing content, tags, media, and enclosures
+    feed = feedparser.parse(
+        response.content,
+        include_content=False,
+        include_tags=False,
+        include_media=False,
+        include_enclosures=False,
+    )
     logger.info(f"RSS feed parsed - Found {len(feed.entries)} entries")
-    
-    for idx, entry in enumerate(feed.entries):
-        logger.info(f"Processing entry {idx+1}/{len(feed.entries)}: {entry.guid} - {entry.title}")
-        if not process_entry(entry):
-            logger.warning(f"Stopping processing at entry {idx+1} due to rate limit")
+
+    now = time.time()
+    recent_entries = []
+    future_entries = 0
+    for entry in feed.entries:
+        if within(entry.published, minutes=recency_threshold, now=now):
+            recent_entries.append(entry)
+        elif datetime.fromisoformat(entry.published).timestamp() > now:
+            logger.info(f"Entry {entry.id} is dated in the future, leaving it for a later run")
+            future_entries += 1
+        else:
+            # The feed is newest-first, so everything after this is older still
             break
-    elapsed_time = time.time() - start_time
-    logger.info(f"Lambda completed in {elapsed_time:.2f}s - Anthropic calls: {anthropic_counter}, Items processed: {items}")
-    metrics.add_metric(
-        name="AnthropicRequests", unit=MetricUnit.Count, value=anthropic_counter
-    )
-    metrics.add_metric(name="ItemsProcessed", unit=MetricUnit.Count, value=items)
-    
-    # Alert if we're making too many API calls
-    if anthropic_counter > 10:
-        logger.warning(f"High API usage detected: {anthropic_counter} calls in single run")
-        metrics.add_metric(
-            name="HighAPIUsage", unit=MetricUnit.Count, value=1
-        )
-        record_failure()  # Record this as a failure
+    logger.info(f"{len(recent_entries)} of {len(feed.entries)} entries are recent")
+
+    posted = fetch_posted_guids(entry.id for entry in recent_entries)
+    new_entries = []
+    for entry in recent_entries:
+        is_posted = entry.id in posted
+        logger.info(f"Entry check - GUID: {entry.id}, Already posted: {is_posted}")
+        if not is_posted:
+            new_entries.append(entry)
+
+    logger.info(f"Enqueueing {len(new_entries)} new entries")
+    enqueue_entries(new_entries)
+    emit_counters({"EntriesEnqueued": len(new_entries)})
+    # Only remember the feed once everything in it is safely queued; future-dated
+    # entries need the next run to see the feed again rather than get a 304
+    if future_entries:
+        logger.warning("Not saving feed state so future-dated entries are picked up later")
     else:
-        reset_failure_count()  # Reset on successful execution
+        save_feed_state(response)
+    flush_writes()
+
+
+# Consumer: summarize and post a batch of entries from SQS, handing back the ones
+# that didn't make it so SQS redelivers them (and eventually dead-letters them)
+@metrics.log_metrics()
+@logger.inject_lambda_context
+def consumer_handler(event, context):
+    start_invocation()
+    start_time = time.time()
+    message_ids = {}
+    entries = []
+    for record in event["Records"]:
+        entry = SimpleNamespace(**json.loads(record["body"]))
+        if entry.id in message_ids:
+            continue  # Same entry queued twice; one copy is enough
+        message_ids[entry.id] = record["messageId"]
+        entries.append(entry)
+    logger.info(f"Consumer started at {start_time} with {len(entries)} entries")
+
+    # The producer may have queued an entry again before an earlier message was handled
+    posted = fetch_posted_guids((entry.id for entry in entries), with_summaries=True)
+    new_entries = [entry for entry in entries if entry.id not in posted]
+    logger.info(f"Processing {len(new_entries)} new entries")
+    if new_entries:
+        get_client()  # Log in up front rather than racing to do it from the posting threads
+    try:
+        unfinished = loop.run_until_complete(process_entries(new_entries))
+    finally:
+        flush_writes()
+    finish_invocation(start_time)
+
+    if unfinished:
+        logger.warning(f"Returning {len(unfinished)} entries to the queue for a retry")
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": message_ids[entry.id]} for entry in unfinished
+        ]
+    }
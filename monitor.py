@@ -12,56 +12,115 @@ from rich.table import Table
 
 console = Console()
 
-def get_recent_metrics(namespace, metric_name, dimensions=None, period_minutes=60):
-    """Get recent CloudWatch metrics"""
+def get_recent_metrics(metric_specs, period_minutes=60):
+    """Get recent CloudWatch metrics for several (namespace, metric, dimensions) specs in one call
+
+    Returns a list, in the same order as metric_specs, of dicts holding each
+    metric's Sum, Average, and Maximum values.
+    """
     cloudwatch = boto3.client('cloudwatch', region_name='us-west-2')
     
     end_time = datetime.utcnow()
     start_time = end_time - timedelta(minutes=period_minutes)
     
+    queries = []
+    for idx, (namespace, metric_name, dimensions) in enumerate(metric_specs):
+        metric = {'Namespace': namespace, 'MetricName': metric_name}
+        if dimensions:
+            metric['Dimensions'] = dimensions
+        for stat in ('Sum', 'Average', 'Maximum'):
+            queries.append({
+                'Id': f"m{idx}_{stat.lower()}",
+                'MetricStat': {
+                    'Metric': metric,
+                    'Period': 300,  # 5-minute periods
+                    'Stat': stat,
+                },
+            })
+    
+    values = {}
     params = {
-        'Namespace': namespace,
-        'MetricName': metric_name,
+        'MetricDataQueries': queries,
         'StartTime': start_time,
         'EndTime': end_time,
-        'Period': 300,  # 5-minute periods
-        'Statistics': ['Sum', 'Average', 'Maximum']
     }
-    
-    if dimensions:
-        params['Dimensions'] = dimensions
-    
-    response = cloudwatch.get_metric_statistics(**params)
-    return response['Datapoints']
+    while True:
+        response = cloudwatch.get_metric_data(**params)
+        for result in response['MetricDataResults']:
+            values.setdefault(result['Id'], []).extend(result['Values'])
+        if 'NextToken' not in response:
+            break
+        params['NextToken'] = response['NextToken']
+    
+    return [
+        {
+            stat: values.get(f"m{idx}_{stat.lower()}", [])
+            for stat in ('Sum', 'Average', 'Maximum')
+        }
+        for idx in range(len(metric_specs))
+    ]
+
+STACK_NAME = 'skeetbot'
 
-def check_lambda_health():
+# Keyed by the functions' logical IDs in template.yaml; the consumer does the
+# summarizing and posting, so its errors and duration matter most
+LAMBDA_METRICS = [
+    ('AwsWhatsNew', 'AWS/Lambda', 'Invocations', 'Producer invocations'),
+    ('AwsWhatsNew', 'AWS/Lambda', 'Errors', 'Producer errors'),
+    ('AwsWhatsNew', 'AWS/Lambda', 'Duration', 'Producer duration (ms)'),
+    ('AwsWhatsNewConsumer', 'AWS/Lambda', 'Invocations', 'Consumer invocations'),
+    ('AwsWhatsNewConsumer', 'AWS/Lambda', 'Errors', 'Consumer errors'),
+    ('AwsWhatsNewConsumer', 'AWS/Lambda', 'Duration', 'Consumer duration (ms)'),
+    ('AwsWhatsNewConsumer', 'AWS/Lambda', 'ConcurrentExecutions', 'Consumer concurrent executions'),
+]
+
+CUSTOM_METRICS_NAMESPACE = 'skeetbot'
+
+CUSTOM_METRICS = [
+    ('AnthropicRequests', 'Anthropic API calls'),
+    ('ItemsProcessed', 'RSS items processed'),
+    ('FailedPosts', 'Failed posts'),
+    ('HighAPIUsage', 'High API usage alerts'),
+    ('CircuitBreakerOpen', 'Circuit breaker activations'),
+]
+
+def get_function_name(logical_id):
+    """Look up a function's deployed name, since SAM appends a random suffix to it"""
+    cloudformation = boto3.client('cloudformation', region_name='us-west-2')
+    response = cloudformation.describe_stack_resource(
+        StackName=STACK_NAME, LogicalResourceId=logical_id
+    )
+    return response['StackResourceDetail']['PhysicalResourceId']
+
+def fetch_all_metrics():
+    """Fetch the Lambda and custom metrics together in a single GetMetricData call"""
+    function_names = {
+        logical_id: get_function_name(logical_id)
+        for logical_id in dict.fromkeys(logical_id for logical_id, _, _, _ in LAMBDA_METRICS)
+    }
+    specs = [
+        (namespace, metric, [{'Name': 'FunctionName', 'Value': function_names[logical_id]}])
+        for logical_id, namespace, metric, _ in LAMBDA_METRICS
+    ]
+    specs += [(CUSTOM_METRICS_NAMESPACE, metric, None) for metric, _ in CUSTOM_METRICS]
+    results = get_recent_metrics(specs)
+    return results[:len(LAMBDA_METRICS)], results[len(LAMBDA_METRICS):]
+
+def check_lambda_health(lambda_results):
     """Check Lambda function health"""
     console.print("\n[bold cyan]Lambda Function Health Check[/bold cyan]")
     
-    function_name = 'skeetbot-AwsWhatsNew-jmoc3Yk4R7VK'
-    
-    # Check various metrics
-    metrics_to_check = [
-        ('AWS/Lambda', 'Invocations', 'Total invocations'),
-        ('AWS/Lambda', 'Errors', 'Errors'),
-        ('AWS/Lambda', 'Duration', 'Duration (ms)'),
-        ('AWS/Lambda', 'ConcurrentExecutions', 'Concurrent executions'),
-    ]
-    
     table = Table(title=f"Lambda Metrics (Last Hour)")
     table.add_column("Metric", style="cyan")
     table.add_column("Total", style="green")
     table.add_column("Average", style="yellow")
     table.add_column("Maximum", style="red")
     
-    for namespace, metric, display_name in metrics_to_check:
-        dimensions = [{'Name': 'FunctionName', 'Value': function_name}]
-        datapoints = get_recent_metrics(namespace, metric, dimensions)
-        
-        if datapoints:
-            total = sum(dp['Sum'] for dp in datapoints)
-            avg = sum(dp['Average'] for dp in datapoints) / len(datapoints) if datapoints else 0
-            maximum = max(dp['Maximum'] for dp in datapoints) if datapoints else 0
+    for (_, namespace, metric, display_name), values in zip(LAMBDA_METRICS, lambda_results):
+        if values['Sum']:
+            total = sum(values['Sum'])
+            avg = sum(values['Average']) / len(values['Average']) if values['Average'] else 0
+            maximum = max(values['Maximum']) if values['Maximum'] else 0
             
             table.add_row(
                 display_name,
@@ -74,31 +133,20 @@ def check_lambda_health():
     
     console.print(table)
 
-def check_custom_metrics():
+def check_custom_metrics(custom_results):
     """Check custom application metrics"""
     console.print("\n[bold cyan]Custom Application Metrics[/bold cyan]")
     
-    metrics_to_check = [
-        ('AnthropicRequests', 'Anthropic API calls'),
-        ('ItemsProcessed', 'RSS items processed'),
-        ('FailedPosts', 'Failed posts'),
-        ('HighAPIUsage', 'High API usage alerts'),
-        ('CircuitBreakerOpen', 'Circuit breaker activations'),
-    ]
-    
     table = Table(title="Application Metrics (Last Hour)")
     table.add_column("Metric", style="cyan")
     table.add_column("Total", style="green")
     table.add_column("Status", style="yellow")
     
-    namespace = 'skeetbot'
     alerts = []
     
-    for metric, display_name in metrics_to_check:
-        datapoints = get_recent_metrics(namespace, metric)
-        
-        if datapoints:
-            total = sum(dp['Sum'] for dp in datapoints)
+    for (metric, display_name), values in zip(CUSTOM_METRICS, custom_results):
+        if values['Sum']:
+            total = sum(values['Sum'])
             
             # Determine status
             status = "✅ OK"
@@ -155,8 +203,9 @@ def main():
     console.print(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     try:
-        check_lambda_health()
-        check_custom_metrics()
+        lambda_results, custom_results = fetch_all_metrics()
+        check_lambda_health(lambda_results)
+        check_custom_metrics(custom_results)
         check_dynamodb_health()
         
         console.print("\n[bold green]✅ Monitoring complete[/bold green]")